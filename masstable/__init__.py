@@ -2,4 +2,6 @@
 
 __version__ = "0.4.1"
 
-from .masstable import Table
\ No newline at end of file
+from .masstable import Table
+from .formulas import MassFormula
+from .fit import Fit
@@ -0,0 +1,6 @@
+"""Allow running the command line tool as ``python -m masstable``"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""The ``masstable`` command line tool.
+
+Examples:
+
+    Look up nuclei read from stdin, one "Z N" pair per line:
+
+        $ printf "82 126\\n50 82\\n" | masstable lookup AME2012 HFB14
+
+    Convert a table between formats (chosen from the file extension):
+
+        $ masstable convert HFB14 hfb14.npz
+        $ masstable convert hfb14.npz hfb14.txt
+
+    Print the rmse of every bundled model:
+
+        $ masstable rmse -r AME1995 -r AME2003 -r AME2012
+
+    or of some of them:
+
+        $ masstable rmse -r AME2012 HFB14 FRDM95
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+from typing import List, Sequence, TextIO
+
+import numpy as np
+import pandas as pd
+
+from . import fill as _fill
+from .masstable import Table
+
+QUANTITIES = [
+    "M",
+    "binding_energy",
+    "q_alpha",
+    "q_beta",
+    "s1n",
+    "s2n",
+    "s1p",
+    "s2p",
+]
+
+
+def _require_arrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "parquet and feather files need pyarrow: pip install masstable[arrow]"
+        )
+
+
+def read_table(source: str) -> Table:
+    """Load a table from a bundled table name or from a file
+
+    Files ending in .npz, .parquet or .feather are read as binary tables with
+    Z, N and M columns, .csv as comma separated and anything else as
+    whitespace separated text.
+    """
+    if source in Table.names():
+        return Table(source)
+    name = os.path.splitext(os.path.basename(source))[0]
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".npz":
+        with np.load(source) as data:
+            return Table.from_ZNM(data["Z"], data["N"], data["M"], name=name)
+    if extension in (".parquet", ".feather"):
+        _require_arrow()
+    if extension == ".parquet":
+        df = pd.read_parquet(source)
+    elif extension == ".feather":
+        df = pd.read_feather(source)
+    elif extension == ".csv":
+        df = pd.read_csv(source)
+    else:
+        df = pd.read_csv(source, sep=r"\s+", header=0)
+    return Table.from_ZNM(df["Z"].values, df["N"].values, df["M"].values, name=name)
+
+
+def write_table(table: Table, path: str):
+    """Save a table, in the format given by the extension of ``path``"""
+    extension = os.path.splitext(path)[1].lower()
+    df = pd.DataFrame({"Z": table.Z, "N": table.N, "M": table.df.values})
+    if extension in (".parquet", ".feather"):
+        _require_arrow()
+    if extension == ".npz":
+        np.savez(path, Z=df["Z"].values, N=df["N"].values, M=df["M"].values)
+    elif extension == ".parquet":
+        df.to_parquet(path, index=False)
+    elif extension == ".feather":
+        df.to_feather(path)
+    elif extension == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_csv(path, sep="\t", index=False)
+
+
+def _parse(lines: List[str], first: int) -> np.ndarray:
+    """Parse "Z N" lines into an (n, 2) integer array
+
+    ``first`` is the number of the first line, used in error messages.
+    """
+    text = "".join(lines)
+    chars = np.frombuffer(text.encode(), dtype=np.uint8)
+    newline = chars == ord("\n")
+    blank = newline | (chars == ord(" ")) | (chars == ord("\t")) | (chars == ord("\r"))
+    # a token starts at every non blank character following a blank one
+    starts = ~blank & np.concatenate([[True], blank[:-1]])
+    line_of = np.cumsum(newline) - newline
+    counts = np.bincount(line_of[starts], minlength=len(lines))[: len(lines)]
+    invalid = np.flatnonzero(counts != 2)
+    if len(invalid) == 0:
+        try:
+            return np.array(text.split(), dtype=int).reshape(-1, 2)
+        except (ValueError, OverflowError):
+            invalid = [i for i, line in enumerate(lines) if not _is_pair(line)]
+    i = invalid[0]
+    raise ValueError(
+        "line {}: expected two integers Z N, got {!r}".format(first + i, lines[i])
+    )
+
+
+def _is_pair(line: str) -> bool:
+    fields = line.split()
+    if len(fields) != 2:
+        return False
+    try:
+        values = [int(f) for f in fields]
+    except ValueError:
+        return False
+    limits = np.iinfo(int)
+    return all(limits.min <= v <= limits.max for v in values)
+
+
+def lookup(
+    tables: Sequence[Table],
+    stdin: TextIO,
+    stdout: TextIO,
+    chunk_size: int = 100000,
+    fmt: str = "%.6f",
+):
+    """Stream "Z N" lines from ``stdin`` and write "Z N value..." lines to ``stdout``
+
+    The tables are laid out once on a dense (Z, N) grid, so every chunk of
+    ``chunk_size`` lines is looked up with a single numpy indexing operation.
+    Nuclei missing from a table give nan.
+    """
+    bounds = _fill.grid_bounds(*[table.df.index for table in tables])
+    Z0, N0, shape = bounds
+    grids = np.stack([_fill.to_grid(table.df, bounds) for table in tables])
+    row_fmt = " ".join(["%d", "%d"] + [fmt] * len(tables)) + "\n"
+
+    first = 1
+    while True:
+        lines = list(itertools.islice(stdin, chunk_size))
+        if not lines:
+            break
+        ZN = _parse(lines, first)
+        first += len(lines)
+        iZ = ZN[:, 0] - Z0
+        iN = ZN[:, 1] - N0
+        inside = (iZ >= 0) & (iZ < shape[0]) & (iN >= 0) & (iN < shape[1])
+        values = np.full((len(ZN), len(tables)), np.nan)
+        values[inside] = grids[:, iZ[inside], iN[inside]].T
+        # a single %-format of the whole chunk is much faster than np.savetxt
+        rows = np.column_stack([ZN, values]).ravel().tolist()
+        stdout.write((row_fmt * len(ZN)) % tuple(rows))
+
+
+def rmse_report(models: Sequence[str], references: Sequence[str], stdout: TextIO):
+    """Write the rmse of every model relative to every reference as a table"""
+    names = list(models) + list(references)
+    unknown = [name for name in names if name not in Table.names()]
+    if unknown:
+        raise ValueError(
+            "unknown table {}, valid names are: {}".format(
+                ", ".join(unknown), " ".join(Table.names())
+            )
+        )
+    tables = {name: Table(name) for name in references}
+    width = max(len(name) for name in models)
+    header = ["{:{}}".format("Model", width)] + [f"{r:>10}" for r in references]
+    stdout.write(" ".join(header) + "\n")
+    for name in models:
+        model = Table(name)
+        errors = [model.rmse(relative_to=tables[r]) for r in references]
+        stdout.write(
+            " ".join(["{:{}}".format(name, width)] + [f"{e:10.3f}" for e in errors])
+            + "\n"
+        )
+
+
+def _quantity(table: Table, quantity: str) -> Table:
+    return table if quantity == "M" else getattr(table, quantity)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="masstable", description="Utilities for working with nuclear mass tables"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    lookup_parser = commands.add_parser(
+        "lookup", help='look up "Z N" lines read from stdin'
+    )
+    lookup_parser.add_argument(
+        "tables", nargs="+", help="table names or files, one output column each"
+    )
+    lookup_parser.add_argument(
+        "-q", "--quantity", choices=QUANTITIES, default="M", help="default: M"
+    )
+    lookup_parser.add_argument(
+        "--fmt", default="%.6f", help="printf format of the values, default: %%.6f"
+    )
+    lookup_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100000,
+        help="number of lines processed at once, default: 100000",
+    )
+
+    convert_parser = commands.add_parser(
+        "convert",
+        help="convert a table between .txt, .csv, .npz, .parquet and .feather",
+    )
+    convert_parser.add_argument("source", help="table name or file")
+    convert_parser.add_argument("destination", help="output file")
+
+    rmse_parser = commands.add_parser("rmse", help="print the rmse of every model")
+    rmse_parser.add_argument(
+        "models", nargs="*", help="tables to evaluate, default: all bundled tables"
+    )
+    rmse_parser.add_argument(
+        "-r",
+        "--relative-to",
+        action="append",
+        help="reference table, repeat for several references, default: AME2003",
+    )
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "lookup":
+            tables = [_quantity(read_table(t), args.quantity) for t in args.tables]
+            lookup(tables, sys.stdin, sys.stdout, args.chunk_size, args.fmt)
+        elif args.command == "convert":
+            write_table(read_table(args.source), args.destination)
+        elif args.command == "rmse":
+            references = args.relative_to or ["AME2003"]
+            rmse_report(args.models or Table.names(), references, sys.stdout)
+    except BrokenPipeError:
+        # the reader went away, e.g. piped into head
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except (ValueError, OSError, ImportError) as e:
+        print("masstable: error: {}".format(e), file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Vectorized estimators used to fill gaps in mass tables.
+
+All estimators work on a dense (Z, N) grid where missing nuclei are NaN. An
+estimator takes such a grid and returns a grid of the same shape with an
+estimate wherever one could be computed (NaN elsewhere).
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Garvey-Kelson local mass relations as ((dZ, dN), sign) terms summing to zero.
+# The transverse relation:
+#   M(Z-2,N+2) - M(Z,N) + M(Z,N+1) - M(Z-1,N+2) + M(Z-1,N) - M(Z-2,N+1) = 0
+GK_TRANSVERSE = (
+    ((-2, 2), 1),
+    ((0, 0), -1),
+    ((0, 1), 1),
+    ((-1, 2), -1),
+    ((-1, 0), 1),
+    ((-2, 1), -1),
+)
+# The longitudinal relation:
+#   M(Z,N+2) - M(Z-2,N) + M(Z-1,N) - M(Z,N+1) + M(Z-2,N+1) - M(Z-1,N+2) = 0
+GK_LONGITUDINAL = (
+    ((0, 2), 1),
+    ((-2, 0), -1),
+    ((-1, 0), 1),
+    ((0, 1), -1),
+    ((-2, 1), 1),
+    ((-1, 2), -1),
+)
+
+
+def grid_bounds(*indexes: pd.MultiIndex) -> Tuple[int, int, Tuple[int, int]]:
+    """Return the first Z, first N and shape of a grid covering all ``indexes``"""
+    Z = np.concatenate([index.get_level_values("Z").values for index in indexes])
+    N = np.concatenate([index.get_level_values("N").values for index in indexes])
+    Z0, N0 = int(Z.min()), int(N.min())
+    return Z0, N0, (int(Z.max()) - Z0 + 1, int(N.max()) - N0 + 1)
+
+
+def to_grid(series: pd.Series, bounds=None) -> np.ndarray:
+    """Convert a (Z, N) indexed Series into a dense 2D array.
+
+    Rows are Z and columns are N, with the origin and shape given by
+    ``bounds`` as returned by :func:`grid_bounds`. Nuclei outside of the
+    bounds are discarded.
+    """
+    Z0, N0, shape = bounds if bounds is not None else grid_bounds(series.index)
+    iZ = series.index.get_level_values("Z").values.astype(int) - Z0
+    iN = series.index.get_level_values("N").values.astype(int) - N0
+    inside = (iZ >= 0) & (iZ < shape[0]) & (iN >= 0) & (iN < shape[1])
+    grid = np.full(shape, np.nan)
+    grid[iZ[inside], iN[inside]] = series.values[inside]
+    return grid
+
+
+def from_grid(grid: np.ndarray, Z0: int, N0: int, name: str = "") -> pd.Series:
+    """Convert a dense 2D grid back into a (Z, N) indexed Series, dropping NaNs"""
+    iZ, iN = np.nonzero(~np.isnan(grid))
+    index = pd.MultiIndex.from_arrays([iZ + Z0, iN + N0], names=["Z", "N"])
+    return pd.Series(grid[iZ, iN], index=index, name=name)
+
+
+def shift(grid: np.ndarray, dZ: int, dN: int) -> np.ndarray:
+    """Return ``out`` such that ``out[Z, N] == grid[Z + dZ, N + dN]``.
+
+    Cells that fall outside of the grid are NaN.
+    """
+    out = np.full_like(grid, np.nan)
+    rows, cols = grid.shape
+    if abs(dZ) >= rows or abs(dN) >= cols:
+        return out
+    dst_z = slice(max(-dZ, 0), rows - max(dZ, 0))
+    src_z = slice(max(dZ, 0), rows - max(-dZ, 0))
+    dst_n = slice(max(-dN, 0), cols - max(dN, 0))
+    src_n = slice(max(dN, 0), cols - max(-dN, 0))
+    out[dst_z, dst_n] = grid[src_z, src_n]
+    return out
+
+
+def _mean_of(estimates: List[np.ndarray], shape) -> np.ndarray:
+    "NaN-aware mean of a list of grids, NaN where no estimate is available"
+    if not estimates:
+        return np.full(shape, np.nan)
+    stack = np.stack(estimates)
+    count = np.sum(~np.isnan(stack), axis=0)
+    total = np.nansum(stack, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def local_relation(grid: np.ndarray, relation: Sequence) -> np.ndarray:
+    """Estimate every cell from a local mass relation.
+
+    Every term of the relation is in turn taken as the unknown, and solved for
+    using the other five terms. The estimate is the mean of all the solutions
+    for which the five neighbours are known.
+    """
+    estimates = []
+    for (tZ, tN), target_sign in relation:
+        total = np.zeros_like(grid)
+        for (dZ, dN), sign in relation:
+            if (dZ, dN) == (tZ, tN):
+                continue
+            total += sign * shift(grid, dZ - tZ, dN - tN)
+        estimates.append(-total / target_sign)
+    return _mean_of(estimates, grid.shape)
+
+
+def garvey_kelson(grid: np.ndarray) -> np.ndarray:
+    """Estimate masses from the transverse and longitudinal Garvey-Kelson relations"""
+    estimates = [
+        local_relation(grid, GK_TRANSVERSE),
+        local_relation(grid, GK_LONGITUDINAL),
+    ]
+    return _mean_of(estimates, grid.shape)
+
+
+# finite difference extrapolation coefficients, indexed by polynomial order
+_EXTRAPOLATION = {
+    0: (1,),
+    1: (2, -1),
+    2: (3, -3, 1),
+    3: (4, -6, 4, -1),
+}
+
+
+def chain(grid: np.ndarray, order: int = 2, step: int = 2) -> np.ndarray:
+    """Polynomial extrapolation along isotopic and isotonic chains.
+
+    Each cell is extrapolated from the ``order + 1`` nearest neighbours on each
+    side along N and along Z. Neighbours are taken ``step`` apart so that the
+    default of 2 only mixes nuclei with the same pairing parity.
+    """
+    coefficients = _EXTRAPOLATION[order]
+    estimates = []
+    for axis_dZ, axis_dN in ((0, 1), (1, 0)):
+        for direction in (-1, 1):
+            total = np.zeros_like(grid)
+            for k, c in enumerate(coefficients, start=1):
+                distance = direction * k * step
+                total += c * shift(grid, axis_dZ * distance, axis_dN * distance)
+            estimates.append(total)
+    return _mean_of(estimates, grid.shape)
+
+
+estimators: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "gk": garvey_kelson,
+    "chain": chain,
+}
+
+
+def interior(grid: np.ndarray) -> np.ndarray:
+    """Mask of the cells lying between the lightest and heaviest known isotope
+    of each element"""
+    known = ~np.isnan(grid)
+    cols = np.arange(grid.shape[1])
+    first = np.where(known.any(axis=1), known.argmax(axis=1), grid.shape[1])
+    last = grid.shape[1] - 1 - known[:, ::-1].argmax(axis=1)
+    return (cols >= first[:, None]) & (cols <= last[:, None])
+
+
+_NEIGHBOURS = [(dZ, dN) for dZ in (-1, 0, 1) for dN in (-1, 0, 1) if dZ or dN]
+
+
+def dilate(mask: np.ndarray) -> np.ndarray:
+    """Grow a boolean mask by one cell in every direction, diagonals included"""
+    grown = mask.copy()
+    as_float = mask.astype(float)
+    for dZ, dN in _NEIGHBOURS:
+        grown |= shift(as_float, dZ, dN) == 1
+    return grown
+
+
+def near(mask: np.ndarray, distance: int) -> np.ndarray:
+    """Mask of the cells at most ``distance`` steps away from a set cell of ``mask``"""
+    for _ in range(distance):
+        mask = dilate(mask)
+    return mask
+
+
+def local_offset(difference: np.ndarray, target: np.ndarray, steps: int) -> np.ndarray:
+    """Extend a sparse grid of differences over the ``target`` cells.
+
+    Every pass gives each empty target cell the mean of its known neighbours,
+    for ``steps`` passes. The offset then fades linearly with the distance to
+    the known differences and is 0 from ``steps + 1`` cells away on, so that
+    it corrects the jump at the edge of the data without carrying a local
+    difference across the whole chart.
+    """
+    offset = difference.copy()
+    distance = np.where(np.isnan(offset), np.inf, 0)
+    for step in range(1, steps + 1):
+        missing = target & np.isnan(offset)
+        shifted = [shift(offset, dZ, dN) for dZ, dN in _NEIGHBOURS]
+        neighbours = _mean_of(shifted, offset.shape)
+        new = missing & ~np.isnan(neighbours)
+        if not new.any():
+            break
+        offset[new] = neighbours[new]
+        distance[new] = step
+    fade = np.clip(1 - distance / (steps + 1), 0, 1)
+    return np.where(np.isnan(offset), 0, offset * fade)
+
+
+def fill_grid(
+    grid: np.ndarray,
+    target: np.ndarray,
+    methods: Sequence[Callable[[np.ndarray], np.ndarray]],
+    fallbacks: Sequence[np.ndarray] = (),
+    max_distance: int = 2,
+    max_depth: int = 2,
+    offset_steps: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fill the NaN cells of ``grid`` which are set in the ``target`` mask.
+
+    The estimators in ``methods`` are tried in order on every pass; a cell is
+    filled by the first one which gives an estimate for it. Newly filled cells
+    can be used as neighbours in the next pass, and the loop runs until no
+    more cells can be filled.
+
+    To keep extrapolation errors from compounding, every cell has a depth: 0
+    for the values initially in ``grid`` and ``k`` for the cells filled in the
+    ``k``-th pass. The estimators only see cells shallower than ``max_depth``,
+    and only fill cells at most ``max_distance`` steps away from the initial
+    values.
+
+    The cells still empty are then taken from the ``fallbacks`` grids, in
+    order. With ``offset_steps`` > 0 each fallback is shifted by its local
+    offset to the known values, fading to 0 within ``offset_steps`` cells of
+    them (see :func:`local_offset`), which smooths the jump at the edge of
+    the data.
+
+    Returns the filled grid and a mask of the cells that were filled.
+    """
+    grid = grid.copy()
+    filled = np.zeros(grid.shape, dtype=bool)
+    depth = np.where(np.isnan(grid), np.inf, 0)
+    reach = target & near(~np.isnan(grid), max_distance)
+    current = 0
+    while True:
+        missing = reach & np.isnan(grid)
+        if not missing.any():
+            break
+        visible = np.where(depth < max_depth, grid, np.nan)
+        new = np.zeros(grid.shape, dtype=bool)
+        estimate = np.full_like(grid, np.nan)
+        for method in methods:
+            values = method(visible)
+            usable = missing & ~new & ~np.isnan(values)
+            estimate[usable] = values[usable]
+            new |= usable
+        if not new.any():
+            break
+        current += 1
+        grid[new] = estimate[new]
+        depth[new] = current
+        filled |= new
+
+    for fallback in fallbacks:
+        available = ~np.isnan(fallback)
+        offset = local_offset(grid - fallback, target & available, offset_steps)
+        usable = target & np.isnan(grid) & available
+        grid[usable] = fallback[usable] + offset[usable]
+        filled |= usable
+
+    return grid, filled
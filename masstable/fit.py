@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Fitting of parametrized mass models to reference tables."""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .formulas import MassFormula
+from .masstable import Table
+
+
+class Fit:
+    """Least squares fit of a mass model to a reference table
+
+    The reference is loaded, filtered and aligned once when the Fit is
+    created, so that every evaluation of the objective is a vectorized
+    residual computation over fixed numpy arrays.
+
+    Parameters:
+
+        model:
+            a MassFormula, or a callable ``f(Z, N, *params)`` over numpy arrays
+            returning mass excesses
+        relative_to:
+            name of the reference table, one of ``Table.names()``, or a Table
+        select:
+            optional condition restricting the nuclei used in the fit, with
+            the same signatures as in ``Table.select``
+        weights:
+            optional weight of every nucleus in the fit, either a callable
+            ``w(Z, N)`` over numpy arrays or a Series indexed by (Z, N).
+            Nuclei without a weight are left out.
+
+    Example:
+
+        Fit the liquid drop formula to the AME2012 nuclei with A >= 16:
+
+            >>> fit = Fit(MassFormula.liquid_drop(), 'AME2012',
+            ...           select=lambda Z, N: Z + N >= 16)
+            >>> result = fit.run()
+            >>> fit.rmse(result.x)
+    """
+
+    def __init__(
+        self,
+        model: Union[MassFormula, Callable],
+        relative_to: Union[str, Table] = "AME2003",
+        select: Callable = None,
+        weights: Union[Callable, pd.Series] = None,
+    ):
+        self.model = model
+        reference = Table(relative_to) if isinstance(relative_to, str) else relative_to
+        if select is not None:
+            reference = reference.select(select)
+        df = reference.df.dropna()
+        Z = df.index.get_level_values("Z").values
+        N = df.index.get_level_values("N").values
+        if weights is None:
+            w = np.ones(len(df))
+        elif callable(weights):
+            w = np.broadcast_to(np.asarray(weights(Z, N), dtype=float), Z.shape)
+        else:
+            w = weights.reindex(df.index).values.astype(float)
+        keep = ~np.isnan(w)
+        self.index = df.index[keep]
+        self.Z = Z[keep]
+        self.N = N[keep]
+        self.M = df.values[keep]
+        self.weights = w[keep]
+        self._sqrt_weights = np.sqrt(self.weights)
+
+    def __len__(self):
+        """Return the number of nuclei in the fit"""
+        return len(self.M)
+
+    def evaluate(self, params: Sequence[float]) -> np.ndarray:
+        """Evaluate the model on the nuclei of the fit"""
+        if isinstance(self.model, MassFormula):
+            return self.model(self.Z, self.N, params)
+        return self.model(self.Z, self.N, *params)
+
+    def residuals(self, params: Sequence[float]) -> np.ndarray:
+        """Return the weighted residuals of the model against the reference"""
+        return (self.evaluate(params) - self.M) * self._sqrt_weights
+
+    def rmse(self, params: Sequence[float]) -> float:
+        """Return the weighted root mean squared error of the model"""
+        residuals = self.residuals(params)
+        return float(np.sqrt(np.sum(residuals ** 2) / np.sum(self.weights)))
+
+    def error(self, params: Sequence[float], name: str = "") -> Table:
+        """Return the difference between the model and the reference as a Table"""
+        return Table(
+            df=pd.Series(self.evaluate(params) - self.M, index=self.index, name=name),
+            name=name,
+        )
+
+    def run(self, x0: Sequence[float] = None, **kwargs):
+        """Minimize the squared residuals with ``scipy.optimize.least_squares``
+
+        Parameters:
+
+            x0:
+                starting parameters, defaults to the MassFormula defaults
+            kwargs:
+                passed on to ``scipy.optimize.least_squares``
+
+        Returns:
+
+            the ``scipy.optimize.OptimizeResult``; the best parameters are in ``x``
+        """
+        from scipy.optimize import least_squares
+
+        if x0 is None:
+            if not isinstance(self.model, MassFormula):
+                raise ValueError("x0 is required when the model is not a MassFormula")
+            x0 = self.model.params()
+        return least_squares(self.residuals, np.asarray(x0, dtype=float), **kwargs)
+
+    def subset(self, positions: Sequence[int]) -> Fit:
+        """Return a Fit over the nuclei at the given positions, which may repeat"""
+        fit = Fit.__new__(Fit)
+        fit.model = self.model
+        fit.index = self.index[positions]
+        for attr in ("Z", "N", "M", "weights", "_sqrt_weights"):
+            setattr(fit, attr, getattr(self, attr)[positions])
+        return fit
+
+    def bootstrap(
+        self,
+        n: int,
+        x0: Sequence[float] = None,
+        processes: int = None,
+        seed: int = None,
+        **kwargs,
+    ) -> np.ndarray:
+        """Refit on ``n`` resamples of the nuclei drawn with replacement
+
+        Parameters:
+
+            n: number of resamples
+            x0: starting parameters, see ``run``
+            processes: number of worker processes, see ``run_many``
+            seed: seed of the random resampling
+            kwargs: passed on to ``scipy.optimize.least_squares``
+
+        Returns:
+
+            an (n, parameters) array with the best parameters of every resample
+        """
+        rng = np.random.default_rng(seed)
+        fits = [self.subset(rng.integers(0, len(self), len(self))) for _ in range(n)]
+        results = run_many(fits, x0, processes=processes, **kwargs)
+        return np.array([result.x for result in results])
+
+
+def _run(fit: Fit, x0, kwargs):
+    return fit.run(x0, **kwargs)
+
+
+def run_many(
+    fits: Sequence[Fit], x0: Sequence[float] = None, processes: int = None, **kwargs
+) -> List:
+    """Run independent fits, optionally on several processes
+
+    Parameters:
+
+        fits: the Fit objects to run
+        x0: starting parameters shared by all fits, see ``Fit.run``
+        processes: number of worker processes. By default the fits run one
+            after the other in the current process; the model must be
+            picklable (e.g. a module level function) to use more.
+        kwargs: passed on to ``scipy.optimize.least_squares``
+
+    Returns:
+
+        the list of ``scipy.optimize.OptimizeResult``, in the order of ``fits``
+    """
+    if processes is None or processes <= 1:
+        return [fit.run(x0, **kwargs) for fit in fits]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_run, fit, x0, kwargs) for fit in fits]
+        return [future.result() for future in futures]
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Vectorized evaluation of analytic mass formulas.
+
+A formula is a function ``f(Z, N, *params)`` returning mass excesses in MeV.
+It must only use numpy broadcasting, so that it can be evaluated at once over
+all nuclei and, when the parameters are given as column vectors, over a batch
+of parameter sets.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .masstable import Table, memoize
+
+M_H = 7.28897050  # hydrogen atom mass excess in MeV
+M_N = 8.0713171  # neutron mass excess in MeV
+MAGIC_NUMBERS = np.array([0, 2, 8, 20, 28, 50, 82, 126, 184, 258, 350, 462])
+
+
+def pairing_sign(Z, N):
+    """+1 for even-even, -1 for odd-odd and 0 for odd-A nuclei"""
+    return (1 - Z % 2) + (1 - N % 2) - 1
+
+
+def valence(x):
+    """Product of valence particles and holes in the open shell of ``x``
+    nucleons, divided by the shell size
+
+    Beyond the last magic number the shell term is 0.
+    """
+    upper_idx = np.searchsorted(MAGIC_NUMBERS, x, side="right")
+    beyond = upper_idx == len(MAGIC_NUMBERS)
+    upper_idx = np.where(beyond, len(MAGIC_NUMBERS) - 1, upper_idx)
+    lower = MAGIC_NUMBERS[upper_idx - 1]
+    upper = MAGIC_NUMBERS[upper_idx]
+    return np.where(beyond, 0, (x - lower) * (upper - x) / (upper - lower))
+
+
+def liquid_drop(Z, N, a_v, a_s, a_c, a_a, a_p, a_sh):
+    """Weizsäcker formula with pairing and a valence shell term, as mass excess"""
+    A = Z + N
+    binding = (
+        a_v * A
+        - a_s * A ** (2 / 3)
+        - a_c * Z * (Z - 1) / A ** (1 / 3)
+        - a_a * (N - Z) ** 2 / A
+        + a_p * pairing_sign(Z, N) / np.sqrt(A)
+        - a_sh * (valence(Z) + valence(N))
+    )
+    return Z * M_H + N * M_N - binding
+
+
+@memoize
+def nuclei_of(name: str) -> pd.MultiIndex:
+    """Return the (Z, N) index of the named table, loaded only once"""
+    return Table(name).df.index
+
+
+def _index(nuclei: Union[str, Table, pd.MultiIndex]) -> pd.MultiIndex:
+    if isinstance(nuclei, str):
+        return nuclei_of(nuclei)
+    if isinstance(nuclei, Table):
+        return nuclei.df.index
+    return nuclei
+
+
+@memoize
+def _load(name: str) -> pd.Series:
+    return Table(name).df
+
+
+def aligned(
+    relative_to: Union[str, Table], nuclei: Union[str, Table, pd.MultiIndex]
+) -> np.ndarray:
+    """Return the values of ``relative_to`` at ``nuclei`` as a numpy array
+
+    The result can be passed as ``relative_to`` to :func:`error` and
+    :func:`rmse` to skip the alignment on every call. Named tables are only
+    loaded from disk once.
+    """
+    reference = _load(relative_to) if isinstance(relative_to, str) else relative_to.df
+    return reference.reindex(_index(nuclei)).values
+
+
+def error(
+    matrix: pd.DataFrame, relative_to: Union[str, Table, np.ndarray] = "AME2003"
+) -> pd.DataFrame:
+    """Difference between every row of a models x nuclides matrix and a table
+
+    ``relative_to`` is a table name, a Table or an array already aligned to
+    the columns of ``matrix``, see :func:`aligned`. Nuclei missing from the
+    reference are NaN.
+    """
+    if not isinstance(relative_to, np.ndarray):
+        relative_to = aligned(relative_to, matrix.columns)
+    values = matrix.values - relative_to
+    return pd.DataFrame(values, index=matrix.index, columns=matrix.columns)
+
+
+def rmse(
+    matrix: pd.DataFrame, relative_to: Union[str, Table, np.ndarray] = "AME2003"
+) -> pd.Series:
+    """Root mean squared error of every row of a models x nuclides matrix"""
+    values = error(matrix, relative_to).values
+    return pd.Series(np.sqrt(np.nanmean(values ** 2, axis=1)), index=matrix.index)
+
+
+class MassFormula:
+    """A parametric mass formula evaluated over whole charts at once
+
+    Parameters:
+
+        function:
+            ``f(Z, N, *params)`` returning mass excesses in MeV
+        defaults:
+            mapping of parameter names to default values, in the order in
+            which ``function`` takes them
+        name:
+            name given to the Tables produced by the formula
+
+    Example:
+
+        Evaluate the liquid drop formula with a stronger surface term on the
+        AME2012 nuclei and compare to experiment:
+
+            >>> ldm = MassFormula.liquid_drop()
+            >>> ldm.table(ldm.params(a_s=18.5), nuclei='AME2012').rmse('AME2012')
+
+        Evaluate 1000 parameter sets at once:
+
+            >>> batch = ldm.params() * np.random.normal(1, 0.01, (1000, 6))
+            >>> reference = aligned('AME2012', 'AME2012')
+            >>> rmse(ldm.matrix(batch, nuclei='AME2012'), reference)
+    """
+
+    def __init__(self, function: Callable, defaults: Dict[str, float], name: str = ""):
+        self.function = function
+        self.defaults = dict(defaults)
+        self.name = name
+
+    @classmethod
+    def liquid_drop(cls) -> MassFormula:
+        """The Weizsäcker liquid drop formula with pairing and shell terms"""
+        defaults = {
+            "a_v": 15.75,
+            "a_s": 17.8,
+            "a_c": 0.711,
+            "a_a": 23.7,
+            "a_p": 11.18,
+            "a_sh": 0.0,
+        }
+        return cls(liquid_drop, defaults, name="LDM")
+
+    @property
+    def names(self):
+        """Return the names of the parameters"""
+        return list(self.defaults)
+
+    def params(self, **kwargs) -> np.ndarray:
+        """Return the default parameter vector, with some values overridden"""
+        unknown = set(kwargs) - set(self.defaults)
+        if unknown:
+            raise ValueError("Unknown parameters: {}".format(", ".join(unknown)))
+        return np.array([kwargs.get(k, v) for k, v in self.defaults.items()])
+
+    def __call__(self, Z, N, params: Sequence[float] = None) -> np.ndarray:
+        """Evaluate the formula at arrays Z and N
+
+        ``params`` is either a single parameter vector, giving an array shaped
+        like Z, or a (models, parameters) matrix, giving a (models, nuclei) array.
+        """
+        params = self.params() if params is None else np.asarray(params, dtype=float)
+        Z = np.asarray(Z)
+        N = np.asarray(N)
+        if params.ndim == 2:
+            Z = np.atleast_1d(Z)
+            N = np.atleast_1d(N)
+            columns = [params[:, [i]] for i in range(params.shape[1])]
+            return self.function(Z[None, :], N[None, :], *columns)
+        return self.function(Z, N, *params)
+
+    def table(
+        self,
+        params: Sequence[float] = None,
+        nuclei: Union[str, Table, pd.MultiIndex] = "AME2012",
+        name: str = None,
+    ) -> Table:
+        """Evaluate the formula with one set of parameters into a Table
+
+        Parameters:
+
+            params: parameter vector, defaults to ``self.params()``
+            nuclei: a table name, a Table or a (Z, N) MultiIndex
+            name: optional name for the resulting Table
+        """
+        index = _index(nuclei)
+        values = self(
+            index.get_level_values("Z").values,
+            index.get_level_values("N").values,
+            params,
+        )
+        name = self.name if name is None else name
+        return Table(df=pd.Series(values, index=index, name=name), name=name)
+
+    def matrix(
+        self,
+        params: Sequence[Sequence[float]],
+        nuclei: Union[str, Table, pd.MultiIndex] = "AME2012",
+    ) -> pd.DataFrame:
+        """Evaluate a batch of parameter vectors into a models x nuclides matrix
+
+        The columns share the (Z, N) index of ``nuclei``, so the result can be
+        passed directly to :func:`error` and :func:`rmse`.
+        """
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        index = _index(nuclei)
+        values = self(
+            index.get_level_values("Z").values,
+            index.get_level_values("N").values,
+            params,
+        )
+        return pd.DataFrame(values, columns=index)
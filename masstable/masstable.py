@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 import os
 import math
 import functools
 from functools import wraps
-from typing import Callable, List, Tuple
+from typing import Callable, List, Sequence, Tuple, Union
+
+from . import fill as _fill
 
 package_dir, _ = os.path.split(__file__)
 
@@ -410,13 +413,13 @@ class Table:
         """
         return self.select(lambda Z, N: not (Z % 2) and not (N % 2), name=self.name)
 
-    def error(self, relative_to: str = "AME2003") -> Table:
+    def error(self, relative_to: Union[str, Table] = "AME2003") -> Table:
         """
         Calculate error difference
 
         Parameters:
 
-            relative_to: a valid mass table name
+            relative_to: a valid mass table name or a Table
 
         Example
         -------
@@ -429,15 +432,16 @@ class Table:
                 11    -0.684870
                 12    -1.167462
         """
-        df = self.df - Table(relative_to).df
+        reference = Table(relative_to) if isinstance(relative_to, str) else relative_to
+        df = self.df - reference.df
         return Table(df=df)
 
-    def rmse(self, relative_to: str = "AME2003"):
+    def rmse(self, relative_to: Union[str, Table] = "AME2003"):
         """Calculate root mean squared error
 
         Parameters:
 
-            relative_to: a valid mass table name.
+            relative_to: a valid mass table name or a Table.
 
         Example
 
@@ -464,6 +468,104 @@ class Table:
         error = self.error(relative_to=relative_to)
         return math.sqrt((error.df ** 2).mean())
 
+    def fill(
+        self,
+        methods: Sequence[Union[str, Callable]] = None,
+        fallback: Sequence[Union[str, Table]] = (),
+        within: Union[str, Table] = None,
+        max_distance: int = 2,
+        max_depth: int = 2,
+        offset_steps: int = 0,
+        name: str = None,
+    ) -> Table:
+        """Fill gaps in the table with vectorized neighbour-based estimators
+
+        Parameters:
+
+            methods:
+                estimators tried in order for every missing nucleus. Either
+                names of built-in estimators ('gk' for the Garvey-Kelson local
+                mass relations, 'chain' for polynomial extrapolation along
+                isotopic and isotonic chains) or callables taking and returning
+                a dense (Z, N) numpy grid, see ``masstable.fill``. Defaults to
+                ('gk', 'chain') when filling interior gaps and to ('gk',) when
+                ``within`` is given, as the one-sided chain extrapolation is
+                much less reliable outside of the known region.
+            fallback:
+                tables (or table names) used for the nuclei that the estimators
+                do not reach, in order of preference. Their values are used as
+                they are unless ``offset_steps`` is set.
+            within:
+                Table (or table name) whose nuclei should be filled. By default
+                only the gaps between the lightest and heaviest isotope of each
+                element are filled.
+            max_distance:
+                the estimators only fill nuclei at most this many steps (in Z,
+                N or both) away from a nucleus of the original table, so that
+                extrapolation errors cannot compound far from the data.
+            max_depth:
+                the filling runs in passes until nothing new can be filled, and
+                every pass can use the values filled by the previous ones. A
+                value filled in the k-th pass has depth k, and only values of
+                depth lower than ``max_depth`` are used as neighbours.
+            offset_steps:
+                shift the fallback values by their local offset to the known
+                masses, fading linearly to no shift ``offset_steps`` cells away
+                from the data. This smooths the jump at the edge of the data;
+                it is off (0) by default.
+            name:
+                optional name for the resulting Table, defaults to the current name
+
+        Returns:
+
+            A new Table with the gaps filled. Its ``filled`` attribute is a
+            boolean Series marking the nuclei whose value was estimated.
+
+        Example:
+
+            Extend AME2012 over the HFB14 chart, with Garvey-Kelson estimates
+            next to the measured masses and HFB14 values further out:
+
+                >>> table = Table('AME2012').fill(fallback=['HFB14'], within='HFB14')
+                >>> table.filled.sum()
+                6035
+        """
+        if methods is None:
+            methods = ("gk", "chain") if within is None else ("gk",)
+        if isinstance(within, str):
+            within = Table(within)
+        methods = [_fill.estimators[m] if isinstance(m, str) else m for m in methods]
+        fallback = [Table(t) if isinstance(t, str) else t for t in fallback]
+
+        indexes = [self.df.index] + ([within.df.index] if within is not None else [])
+        bounds = _fill.grid_bounds(*indexes)
+        Z0, N0, _ = bounds
+        grid = _fill.to_grid(self.df, bounds)
+        if within is None:
+            target = _fill.interior(grid)
+        else:
+            nuclei = pd.Series(1.0, index=within.df.index)
+            target = ~np.isnan(_fill.to_grid(nuclei, bounds))
+
+        grid, filled = _fill.fill_grid(
+            grid,
+            target,
+            methods,
+            [_fill.to_grid(t.df, bounds) for t in fallback],
+            max_distance=max_distance,
+            max_depth=max_depth,
+            offset_steps=offset_steps,
+        )
+        grid[~filled] = np.nan
+        estimates = _fill.from_grid(grid, Z0, N0)
+
+        name = self.name if name is None else name
+        df = self.df.combine_first(estimates)
+        df.name = name
+        result = Table(df=df, name=name)
+        result.filled = pd.Series(df.index.isin(estimates.index), index=df.index)
+        return result
+
     @property
     @memoize
     def binding_energy(self):
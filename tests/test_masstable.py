@@ -1,5 +1,5 @@
 import pytest
-from masstable import Table
+from masstable import Fit, MassFormula, Table
 
 
 def test_runs():
@@ -36,3 +36,179 @@ def test_condition_filtering():
     result = Table("AME2003")[A_equal_265]
     assert result.count == 1
     
+
+
+def test_fill():
+    ame2012 = Table("AME2012")
+    removed = [(50, 70), (82, 120)]
+    table = Table(df=ame2012.df.drop(removed), name="AME2012")
+    result = table.fill(methods=["gk"])
+    assert result.filled.sum() >= len(removed)
+    assert not result.filled[(50, 72)]
+    for nucleus in removed:
+        assert result.filled[nucleus]
+        assert result.df[nucleus] == pytest.approx(ame2012.df[nucleus], abs=1)
+
+
+def test_fill_fallback():
+    ame2012 = Table("AME2012")
+    hfb14 = Table("HFB14")
+    result = ame2012.fill(methods=[], fallback=[hfb14], within=hfb14)
+    missing = hfb14.not_in(ame2012).count
+    assert result.count == ame2012.count + missing
+    assert result.filled.sum() == missing
+
+
+def test_mass_formula_batch():
+    from masstable.formulas import rmse
+
+    ldm = MassFormula.liquid_drop()
+    batch = [ldm.params(), ldm.params(a_sh=0.5)]
+    matrix = ldm.matrix(batch, nuclei="AME2012")
+    assert matrix.shape == (2, Table("AME2012").count)
+    expected = [ldm.table(params).rmse("AME2012") for params in batch]
+    assert rmse(matrix, "AME2012").values == pytest.approx(expected)
+
+
+def test_mass_formula_table():
+    ldm = MassFormula.liquid_drop()
+    result = ldm.table(nuclei=Table("AME2012").at([(82, 126)]))
+    assert result.df[(82, 126)] == pytest.approx(ldm(82, 126))
+
+
+def test_fit():
+    linear = lambda Z, N, a, b: a * Z + b * N
+    truth = linear(Table("AME2012").Z, Table("AME2012").N, 1.5, -0.5)
+    reference = Table.from_ZNM(Table("AME2012").Z, Table("AME2012").N, truth)
+    fit = Fit(linear, reference, select=lambda Z, N: Z + N > 100)
+    result = fit.run([0, 0])
+    assert result.x == pytest.approx([1.5, -0.5])
+    assert fit.rmse(result.x) == pytest.approx(0, abs=1e-6)
+    assert len(fit) == reference.select(lambda Z, N: Z + N > 100).count
+
+
+def test_fit_bootstrap():
+    fit = Fit(MassFormula.liquid_drop(), "AME2012", weights=lambda Z, N: Z + N >= 16)
+    params = fit.bootstrap(2, seed=0)
+    assert params.shape == (2, len(MassFormula.liquid_drop().names))
+
+
+def test_cli_lookup():
+    import io
+
+    from masstable.cli import lookup
+
+    stdin = io.StringIO("82 126\n1 300\n")
+    stdout = io.StringIO()
+    lookup([Table("AME2012"), Table("HFB14")], stdin, stdout, chunk_size=1)
+    first, second = stdout.getvalue().splitlines()
+    assert first.split()[:2] == ["82", "126"]
+    assert float(first.split()[3]) == pytest.approx(-21.88)
+    assert second.split()[2:] == ["nan", "nan"]
+
+
+def test_cli_convert(tmp_path):
+    from masstable.cli import main, read_table
+
+    for extension in ["npz", "csv", "txt"]:
+        path = str(tmp_path / ("HFB14." + extension))
+        assert main(["convert", "HFB14", path]) == 0
+        result = read_table(path)
+        assert result.count == Table("HFB14").count
+        assert result.df[(82, 126)] == pytest.approx(-21.88)
+
+
+def test_fill_within_model():
+    # hold out the 4 most neutron rich measured isotopes of every element
+    ame2012 = Table("AME2012")
+    hfb14 = Table("HFB14")
+    df = ame2012.df.rename("M").reset_index()
+    held_out = df.sort_values("N").groupby("Z").tail(4).set_index(["Z", "N"])["M"]
+    table = Table(df=ame2012.df.drop(held_out.index), name="AME2012")
+
+    def rms_error(result):
+        nuclei = held_out.index.intersection(result.df[result.filled].index)
+        error = result.df[nuclei] - held_out[nuclei]
+        return len(nuclei), (error ** 2).mean() ** 0.5
+
+    hfb14_error = (hfb14.df.reindex(held_out.index) - held_out).dropna()
+    hfb14_rms = (hfb14_error ** 2).mean() ** 0.5
+
+    count, rms = rms_error(table.fill(within="HFB14"))
+    assert count > 100
+    assert rms < 0.5
+
+    count, rms = rms_error(table.fill(methods=[], fallback=[hfb14], within=hfb14))
+    assert count == len(hfb14_error)
+    assert rms == pytest.approx(hfb14_rms)
+
+    count, rms = rms_error(table.fill(fallback=[hfb14], within=hfb14))
+    assert count == len(hfb14_error)
+    assert rms <= hfb14_rms
+
+    result = table.fill(fallback=[hfb14], within=hfb14, offset_steps=2)
+    assert rms_error(result)[1] < hfb14_rms
+
+
+
+def test_mass_formula_heavy_nuclei():
+    ldm = MassFormula.liquid_drop()
+    for name in ["HFB26", "WS32010"]:
+        result = ldm.table(ldm.params(a_sh=0.5), nuclei=name)
+        assert result.count == Table(name).count
+        assert not result.df.isnull().any()
+
+
+def test_mass_formula_scalar_batch():
+    from masstable.formulas import aligned, rmse
+
+    ldm = MassFormula.liquid_drop()
+    batch = [ldm.params(), ldm.params(a_sh=0.5)]
+    assert ldm(82, 126, batch).shape == (2, 1)
+    assert ldm(82, 126, batch)[0, 0] == pytest.approx(ldm(82, 126))
+
+    matrix = ldm.matrix(batch, nuclei="AME2012")
+    reference = aligned("AME2012", "AME2012")
+    expected = rmse(matrix, "AME2012").values
+    assert rmse(matrix, reference).values == pytest.approx(expected)
+
+
+def test_cli_lookup_malformed_line():
+    import io
+
+    from masstable.cli import lookup
+
+    stdin = io.StringIO("82 126 5\n50\n")
+    with pytest.raises(ValueError, match="line 1"):
+        lookup([Table("AME2012")], stdin, io.StringIO())
+
+
+def test_cli_rmse_unknown_table(capsys):
+    from masstable.cli import main
+
+    assert main(["rmse", "FOO"]) == 1
+    assert main(["rmse", "-r", "FOO", "HFB14"]) == 1
+    assert "unknown table FOO" in capsys.readouterr().err
+
+
+def test_cli_lookup_out_of_range():
+    import io
+
+    from masstable.cli import lookup
+
+    stdin = io.StringIO("82 126\n99999999999999999999 1\n")
+    with pytest.raises(ValueError, match="line 2"):
+        lookup([Table("AME2012")], stdin, io.StringIO())
+
+
+def test_cli_rmse_references(capsys):
+    from masstable.cli import main
+
+    assert main(["rmse", "-r", "AME2012", "HFB14"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["Model", "AME2012"]
+    assert [line.split()[0] for line in lines[1:]] == ["HFB14"]
+
+    assert main(["rmse", "-r", "AME2003", "-r", "AME2012", "HFB14"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["Model", "AME2003", "AME2012"]